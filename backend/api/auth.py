@@ -4,39 +4,97 @@ Authentication API Routes
 Handles user registration, login, logout, and profile management.
 Uses JWT tokens stored in HTTP-only cookies for security.
 """
+import base64
+import hashlib
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from uuid import UUID
 
+import bcrypt
+import orjson
+from cachetools import TTLCache
+
 from fastapi import APIRouter, Depends, HTTPException, Response, Request, status
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
-from pathlib import Path
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import get_settings
 from models.user import UserCreate, User, LoginRequest, Token
 from services.db import get_session, User as DBUser
+from templating import templates
 
 router = APIRouter()
-TEMPLATES_DIR = str(Path(__file__).resolve().parent.parent.parent / "frontend" / "templates")
-templates = Jinja2Templates(directory=TEMPLATES_DIR)
 settings = get_settings()
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Settings read on the request path, bound once to plain module globals
+_SECURE = not settings.debug
+_MAX_AGE = settings.access_token_expire_minutes * 60
+_TOKEN_EXPIRE = timedelta(minutes=settings.access_token_expire_minutes)
+_ALG = settings.algorithm
+_JWT_CACHE_TTL = settings.jwt_cache_ttl
+_USE_PWD_CACHE = settings.use_verify_password_cache
+_BCRYPT_ROUNDS = settings.bcrypt_rounds
+
+# JWT verification config, built once instead of per decode
+_SECRET_BYTES = settings.secret_key.encode()
+_JWT_ALGORITHMS = [_ALG]
+_JWT_OPTS = {"require_exp": True, "require_sub": True, "verify_aud": False}
+
+# python-jose writes the header with sorted keys, so every token we issue
+# starts with the base64 of '{"alg":"<ALG>",' (cut to whole 3-byte groups)
+_header_prefix = f'{{"alg":"{_ALG}",'.encode()
+_JWT_HEADER_PREFIX = base64.urlsafe_b64encode(
+    _header_prefix[:len(_header_prefix) // 3 * 3]
+).decode()
+
+# Auth cookie attributes are fixed for the process, so the header is
+# formatted once; JWTs only contain cookie-safe characters.
+_COOKIE_TEMPLATE = (
+    f"access_token=%s; HttpOnly; Max-Age={_MAX_AGE}; Path=/; SameSite=strict"
+    f"{'; Secure' if _SECURE else ''}"
+)
+
+# Verified token -> (user_id, exp) cache, so repeat requests skip JWT decode
+_token_cache: TTLCache = TTLCache(maxsize=10000, ttl=_JWT_CACHE_TTL)
+_token_cache_lock = threading.Lock()
+
+# Recently verified (password, hash) pairs, so repeat logins skip bcrypt
+_pwd_cache: TTLCache = TTLCache(maxsize=2048, ttl=60)
+_pwd_cache_lock = threading.Lock()
+
+
+def _token_key(token: str) -> bytes:
+    """Short digest of a token, used as the cache key."""
+    return hashlib.sha256(token.encode()).digest()[:16]
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    if not _USE_PWD_CACHE:
+        return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+    
+    # The key covers the stored hash, so a changed password never hits
+    key = hashlib.sha256(plain_password.encode() + hashed_password.encode()).digest()
+    with _pwd_cache_lock:
+        if key in _pwd_cache:
+            return True
+    
+    verified = bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+    if verified:
+        # Only successes are cached; failures always re-run bcrypt
+        with _pwd_cache_lock:
+            _pwd_cache[key] = True
+    return verified
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password for storage."""
-    return pwd_context.hash(password)
+    salt = bcrypt.gensalt(rounds=_BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode(), salt).decode()
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -44,19 +102,26 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+    return jwt.encode(to_encode, _SECRET_BYTES, algorithm=_ALG)
 
 
-def get_db():
+def set_auth_cookie(response: Response, access_token: str) -> None:
+    """Attach the access_token cookie to a response."""
+    response.raw_headers.append(
+        (b"set-cookie", (_COOKIE_TEMPLATE % access_token).encode("latin-1"))
+    )
+
+
+async def get_db():
     """Database session dependency."""
     db = get_session()
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
 
 
-async def get_current_user(request: Request, db: Session = Depends(get_db)) -> Optional[DBUser]:
+async def get_current_user(request: Request, db: AsyncSession = Depends(get_db)) -> Optional[DBUser]:
     """
     Dependency to get current user from JWT cookie.
     Returns None if not authenticated (for optional auth).
@@ -65,21 +130,42 @@ async def get_current_user(request: Request, db: Session = Depends(get_db)) -> O
     if not token:
         return None
     
+    # Cheap screen for garbage cookies before hashing or HMAC verification
+    if token.count(".") != 2 or len(token) < 20 or not token.startswith(_JWT_HEADER_PREFIX):
+        return None
+    
+    key = _token_key(token)
+    with _token_cache_lock:
+        cached = _token_cache.get(key)
+    if cached is not None:
+        user_id, exp = cached
+        if exp > time.time():
+            return await db.get(DBUser, user_id)
+        with _token_cache_lock:
+            _token_cache.pop(key, None)
+    
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
+        payload = jwt.decode(token, _SECRET_BYTES, algorithms=_JWT_ALGORITHMS, options=_JWT_OPTS)
     except JWTError:
         return None
     
-    user = db.query(DBUser).filter(DBUser.email == email).first()
+    # exp and sub are guaranteed present by _JWT_OPTS
+    result = await db.execute(select(DBUser).where(DBUser.email == payload["sub"]))
+    user = result.scalar_one_or_none()
+    if user is not None:
+        # Never serve a cached entry past the token's own expiry
+        exp = min(time.time() + _JWT_CACHE_TTL, payload["exp"])
+        with _token_cache_lock:
+            _token_cache[key] = (user.id, exp)
     return user
 
 
-async def require_auth(request: Request, db: Session = Depends(get_db)) -> DBUser:
-    """Dependency that requires authentication."""
-    user = await get_current_user(request, db)
+async def require_auth(user: Optional[DBUser] = Depends(get_current_user)) -> DBUser:
+    """
+    Dependency that requires authentication.
+    Resolves get_current_user through Depends so FastAPI's per-request
+    dependency cache shares one lookup with any other consumer.
+    """
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -109,7 +195,7 @@ async def register_page(request: Request):
 async def register(
     request: Request,
     response: Response,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Register a new user."""
     form = await request.form()
@@ -117,7 +203,8 @@ async def register(
     password = form.get("password")
     
     # Check if user exists
-    existing = db.query(DBUser).filter(DBUser.email == email).first()
+    result = await db.execute(select(DBUser).where(DBUser.email == email))
+    existing = result.scalar_one_or_none()
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -131,24 +218,17 @@ async def register(
         preferences={}
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
     # Create token and set cookie
     access_token = create_access_token(
         data={"sub": user.email},
-        expires_delta=timedelta(minutes=settings.access_token_expire_minutes)
+        expires_delta=_TOKEN_EXPIRE
     )
     
     response = RedirectResponse(url="/dashboard", status_code=status.HTTP_303_SEE_OTHER)
-    response.set_cookie(
-        key="access_token",
-        value=access_token,
-        httponly=True,
-        secure=not settings.debug,
-        samesite="strict",
-        max_age=settings.access_token_expire_minutes * 60
-    )
+    set_auth_cookie(response, access_token)
     return response
 
 
@@ -156,14 +236,15 @@ async def register(
 async def login(
     request: Request,
     response: Response,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Authenticate user and return JWT token."""
     form = await request.form()
     email = form.get("email")
     password = form.get("password")
     
-    user = db.query(DBUser).filter(DBUser.email == email).first()
+    result = await db.execute(select(DBUser).where(DBUser.email == email))
+    user = result.scalar_one_or_none()
     if not user or not verify_password(password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -172,35 +253,50 @@ async def login(
     
     access_token = create_access_token(
         data={"sub": user.email},
-        expires_delta=timedelta(minutes=settings.access_token_expire_minutes)
+        expires_delta=_TOKEN_EXPIRE
     )
     
     response = RedirectResponse(url="/dashboard", status_code=status.HTTP_303_SEE_OTHER)
-    response.set_cookie(
-        key="access_token",
-        value=access_token,
-        httponly=True,
-        secure=not settings.debug,
-        samesite="strict",
-        max_age=settings.access_token_expire_minutes * 60
-    )
+    set_auth_cookie(response, access_token)
     return response
 
 
 @router.post("/logout")
-async def logout(response: Response):
+async def logout(request: Request, response: Response):
     """Clear authentication cookie."""
+    token = request.cookies.get("access_token")
+    if token:
+        with _token_cache_lock:
+            _token_cache.pop(_token_key(token), None)
+    
     response = RedirectResponse(url="/", status_code=status.HTTP_303_SEE_OTHER)
     response.delete_cookie("access_token")
     return response
 
 
 @router.get("/me")
-async def get_me(user: DBUser = Depends(require_auth)):
-    """Get current user information."""
-    return {
+async def get_me(
+    request: Request,
+    response: Response,
+    user: DBUser = Depends(require_auth)
+):
+    """
+    Get current user information.
+    Sends a weak ETag so unchanged profiles are answered with 304.
+    """
+    data = {
         "id": str(user.id),
         "email": user.email,
         "preferences": user.preferences,
         "created_at": user.created_at.isoformat()
     }
+    
+    # Derived from the payload itself: users have no updated_at, and
+    # preferences change through recommendation feedback
+    etag = f'W/"{hashlib.sha256(orjson.dumps(data)).hexdigest()[:16]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=5"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    response.headers.update(headers)
+    return data
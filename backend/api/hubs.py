@@ -4,42 +4,74 @@ Specialized Hubs API Routes
 Handles the "Hub" specific pages (TCG, Retro, Comics).
 These pages act as curated entry points with specific filters and layouts.
 """
-from typing import Optional
+from dataclasses import dataclass
+from typing import Optional, Tuple
 from fastapi import APIRouter, Request, Depends
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-from pathlib import Path
 from services.db import get_session
 from api.auth import get_current_user
+from templating import templates
 
 router = APIRouter()
-TEMPLATES_DIR = str(Path(__file__).resolve().parent.parent.parent / "frontend" / "templates")
-templates = Jinja2Templates(directory=TEMPLATES_DIR)
+
+
+@dataclass(frozen=True, slots=True)
+class HubConfig:
+    """Static presentation settings for a hub page."""
+    title: str
+    subtitle: str
+    icon: str
+    filters: Tuple[str, ...]
+    hero_class: str
+
 
 HUB_CONFIG = {
-    "tcg": {
-        "title": "TCG Vault",
-        "subtitle": "Pokémon, Magic, Yu-Gi-Oh!",
-        "icon": "🃏",
-        "filters": ["set", "rarity", "grading"],
-        "hero_class": "hero-tcg"
-    },
-    "retro": {
-        "title": "Retro Cave",
-        "subtitle": "Nintendo, Sega, PlayStation",
-        "icon": "🕹️",
-        "filters": ["console", "region", "completeness"],
-        "hero_class": "hero-retro"
-    },
-    "comics": {
-        "title": "Comics Corner",
-        "subtitle": "Manga, Marvel, Bonelli",
-        "icon": "📚",
-        "filters": ["publisher", "era", "first_edition"],
-        "hero_class": "hero-comics"
-    }
+    "tcg": HubConfig(
+        title="TCG Vault",
+        subtitle="Pokémon, Magic, Yu-Gi-Oh!",
+        icon="🃏",
+        filters=("set", "rarity", "grading"),
+        hero_class="hero-tcg"
+    ),
+    "retro": HubConfig(
+        title="Retro Cave",
+        subtitle="Nintendo, Sega, PlayStation",
+        icon="🕹️",
+        filters=("console", "region", "completeness"),
+        hero_class="hero-retro"
+    ),
+    "comics": HubConfig(
+        title="Comics Corner",
+        subtitle="Manga, Marvel, Bonelli",
+        icon="📚",
+        filters=("publisher", "era", "first_edition"),
+        hero_class="hero-comics"
+    )
 }
 
+
+def hub_context(category: str, config: HubConfig, user=None) -> dict:
+    """Template context shared by live and pre-rendered hub pages."""
+    return {
+        "category": category,
+        "config": config,
+        "user": user,
+        "title": f"{config.title} | Piranha ITA"
+    }
+
+
+def render_anonymous_hubs() -> dict:
+    """
+    Render every hub page for a logged-out visitor.
+    The output depends only on the category, so it is built once at startup.
+    """
+    template = templates.get_template("hubs/hub.html")
+    return {
+        category: template.render(hub_context(category, config)).encode()
+        for category, config in HUB_CONFIG.items()
+    }
+
+
 @router.get("/{category}", response_class=HTMLResponse)
 async def get_hub(
     request: Request,
@@ -49,6 +81,11 @@ async def get_hub(
     """
     Render a specialized hub page.
     """
+    if user is None:
+        cached = getattr(request.app.state, "hub_cache", {}).get(category)
+        if cached is not None:
+            return HTMLResponse(content=cached)
+    
     config = HUB_CONFIG.get(category)
     if not config:
         # Fallback for unknown categories or redirect to search
@@ -57,11 +94,5 @@ async def get_hub(
     
     return templates.TemplateResponse(
         "hubs/hub.html",
-        {
-            "request": request,
-            "category": category,
-            "config": config,
-            "user": user,
-            "title": f"{config['title']} | Piranha ITA"
-        }
+        {"request": request, **hub_context(category, config, user)}
     )
@@ -4,38 +4,92 @@ Products API Routes
 Handles product listing, filtering, and comparison.
 Supports HTMX partial rendering for infinite scroll.
 """
-from typing import Optional, List
+import base64
+from datetime import datetime
+from typing import Optional, List, Tuple
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, Query, Request
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from pathlib import Path
+from sqlalchemy import or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 
-from services.db import get_session, Product as DBProduct
+from services.db import get_session, Product as DBProduct, SCRAPED_AT_FALLBACK, product_sort_date
 from api.auth import get_current_user
 from services.db import User as DBUser
+from templating import templates
 
 router = APIRouter()
-TEMPLATES_DIR = str(Path(__file__).resolve().parent.parent.parent / "frontend" / "templates")
-templates = Jinja2Templates(directory=TEMPLATES_DIR)
 
 
-def get_db():
+async def get_db():
     """Database session dependency."""
     db = get_session()
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
+
+
+def encode_cursor(product: DBProduct) -> str:
+    """Build an opaque pagination cursor from the last product of a page."""
+    scraped_at = product.scraped_at or SCRAPED_AT_FALLBACK
+    raw = f"{scraped_at.isoformat()}|{product.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    """Inverse of encode_cursor. Raises ValueError on malformed input."""
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    scraped_at, product_id = raw.split("|", 1)
+    return datetime.fromisoformat(scraped_at), UUID(product_id)
+
+
+def next_page_url(request: Request, cursor: str) -> str:
+    """The current list URL, filters included, pointing at the next page."""
+    url = request.url.include_query_params(cursor=cursor)
+    return f"{url.path}?{url.query}"
+
+
+# Columns rendered by products/_list_items.html, plus scraped_at for the
+# cursor. Keeps the heavy description column off list queries; anything
+# not listed here must not be touched by the list templates.
+LIST_COLUMNS = (
+    DBProduct.id,
+    DBProduct.title,
+    DBProduct.price_eur,
+    DBProduct.brand,
+    DBProduct.condition,
+    DBProduct.region,
+    DBProduct.city,
+    DBProduct.source_name,
+    DBProduct.scraped_at,
+)
+
+# Equality filters, keyed by list_products parameter name. The column
+# expressions (including the JSONB accessors) are built once at import.
+SCALAR_FILTERS = {
+    "category": DBProduct.category,
+    "condition": DBProduct.condition,
+    "region": DBProduct.region,
+}
+
+META_FILTERS = {
+    "set_name": DBProduct.metadata_["set"].astext,
+    "rarity": DBProduct.metadata_["rarity"].astext,
+    "grading": DBProduct.metadata_["grading"].astext,
+    "console": DBProduct.metadata_["console"].astext,
+    "completeness": DBProduct.metadata_["completeness"].astext,
+    "publisher": DBProduct.metadata_["publisher"].astext,
+    "era": DBProduct.metadata_["era"].astext,
+}
 
 
 @router.get("", response_class=HTMLResponse)
 async def list_products(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user: Optional[DBUser] = Depends(get_current_user),
     # Filters
     category: Optional[str] = None,
@@ -53,65 +107,69 @@ async def list_products(
     completeness: Optional[str] = None,
     publisher: Optional[str] = None,
     era: Optional[str] = None,
-    # Pagination
-    page: int = Query(1, ge=1),
+    # Pagination (keyset cursor returned by the previous page)
+    cursor: Optional[str] = None,
     per_page: int = Query(12, ge=1, le=50),
 ):
     """
     List products with filtering and pagination.
     Returns full page or partial (for HTMX infinite scroll).
     """
-    query = db.query(DBProduct)
+    # Snapshot of the query parameters, looked up by name in the filter tables
+    params = locals()
     
-    # Apply filters
-    if category:
-        query = query.filter(DBProduct.category == category)
+    # Apply filters (collected so SQLAlchemy builds a single WHERE)
+    clauses = [
+        column == params[name]
+        for name, column in SCALAR_FILTERS.items()
+        if params[name]
+    ]
     if brand:
-        query = query.filter(DBProduct.brand.ilike(f"%{brand}%"))
+        clauses.append(DBProduct.brand.ilike(f"%{brand}%"))
     if min_price is not None:
-        query = query.filter(DBProduct.price_eur >= min_price)
+        clauses.append(DBProduct.price_eur >= min_price)
     if max_price is not None:
-        query = query.filter(DBProduct.price_eur <= max_price)
-    if condition:
-        query = query.filter(DBProduct.condition == condition)
-    if region:
-        query = query.filter(DBProduct.region == region)
+        clauses.append(DBProduct.price_eur <= max_price)
     if search:
-        query = query.filter(
+        clauses.append(
             or_(
                 DBProduct.title.ilike(f"%{search}%"),
                 DBProduct.description.ilike(f"%{search}%")
             )
         )
     
-
-    
     # Apply Metadata Filters
-    if set_name:
-        query = query.filter(DBProduct.metadata_["set"].astext == set_name)
-    if rarity:
-        query = query.filter(DBProduct.metadata_["rarity"].astext == rarity)
-    if grading:
-        query = query.filter(DBProduct.metadata_["grading"].astext == grading)
-    if console:
-        query = query.filter(DBProduct.metadata_["console"].astext == console)
-    if completeness:
-        query = query.filter(DBProduct.metadata_["completeness"].astext == completeness)
-    if publisher:
-        query = query.filter(DBProduct.metadata_["publisher"].astext == publisher)
-    if era:
-        query = query.filter(DBProduct.metadata_["era"].astext == era)
-
-    # Get total count for pagination
-    total = query.count()
+    clauses.extend(
+        column == params[name]
+        for name, column in META_FILTERS.items()
+        if params[name]
+    )
+    
+    query = select(DBProduct).options(load_only(*LIST_COLUMNS)).where(*clauses)
     
-    # Order by newest first and paginate
-    products = query.order_by(DBProduct.scraped_at.desc()) \
-                    .offset((page - 1) * per_page) \
-                    .limit(per_page) \
-                    .all()
+    # Resume after the last row of the previous page
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except (ValueError, UnicodeDecodeError):
+            return templates.TemplateResponse(
+                "errors/400.html",
+                {"request": request, "message": "Invalid pagination cursor"},
+                status_code=400
+            )
+        query = query.where(tuple_(product_sort_date, DBProduct.id) < after)
+    
+    # Order by newest first; fetch one extra row to know if there is more
+    result = await db.execute(
+        query.order_by(product_sort_date.desc(), DBProduct.id.desc())
+             .limit(per_page + 1)
+    )
+    products = result.scalars().all()
     
-    has_more = (page * per_page) < total
+    has_more = len(products) > per_page
+    products = products[:per_page]
+    next_cursor = encode_cursor(products[-1]) if has_more else None
+    next_url = next_page_url(request, next_cursor) if has_more else None
     
     # Check if HTMX request (partial render)
     if request.headers.get("HX-Request"):
@@ -120,7 +178,8 @@ async def list_products(
             {
                 "request": request,
                 "products": products,
-                "page": page,
+                "next_cursor": next_cursor,
+                "next_url": next_url,
                 "has_more": has_more,
             }
         )
@@ -131,8 +190,8 @@ async def list_products(
         {
             "request": request,
             "products": products,
-            "total": total,
-            "page": page,
+            "next_cursor": next_cursor,
+            "next_url": next_url,
             "per_page": per_page,
             "has_more": has_more,
             "user": user,
@@ -158,14 +217,21 @@ async def list_products(
 async def compare_products(
     request: Request,
     ids: str = Query(..., description="Comma-separated product IDs"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user: Optional[DBUser] = Depends(get_current_user),
 ):
     """
     Compare multiple products side-by-side.
     Accepts comma-separated UUIDs.
     """
-    product_ids = [UUID(id.strip()) for id in ids.split(",") if id.strip()]
+    try:
+        product_ids = [UUID(id.strip()) for id in ids.split(",") if id.strip()]
+    except ValueError:
+        return templates.TemplateResponse(
+            "errors/400.html",
+            {"request": request, "message": "Invalid product ID"},
+            status_code=400
+        )
     
     if len(product_ids) < 2:
         return templates.TemplateResponse(
@@ -177,7 +243,10 @@ async def compare_products(
     if len(product_ids) > 4:
         product_ids = product_ids[:4]  # Limit to 4 for UI
     
-    products = db.query(DBProduct).filter(DBProduct.id.in_(product_ids)).all()
+    result = await db.execute(select(DBProduct).where(DBProduct.id.in_(product_ids)))
+    # Keep the order the products were requested in
+    by_id = {p.id: p for p in result.scalars().all()}
+    products = [by_id[pid] for pid in product_ids if pid in by_id]
     
     return templates.TemplateResponse(
         "products/compare.html",
@@ -189,11 +258,11 @@ async def compare_products(
 async def get_product(
     request: Request,
     product_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user: Optional[DBUser] = Depends(get_current_user),
 ):
     """Get single product details."""
-    product = db.query(DBProduct).filter(DBProduct.id == product_id).first()
+    product = await db.get(DBProduct, product_id)
     
     if not product:
         return templates.TemplateResponse(
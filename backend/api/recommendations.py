@@ -9,44 +9,80 @@ from uuid import UUID
 
 from fastapi import APIRouter, Depends, Request, HTTPException
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from pathlib import Path
-import redis
-import json
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+import orjson
+import redis.asyncio as aioredis
 
 from config import get_settings
 from services.db import get_session, Product as DBProduct, Recommendation as DBRecommendation
 from services.db import User as DBUser
-from api.auth import get_current_user, require_auth
+from api.auth import require_auth
+from templating import templates
 
 router = APIRouter()
-TEMPLATES_DIR = str(Path(__file__).resolve().parent.parent.parent / "frontend" / "templates")
-templates = Jinja2Templates(directory=TEMPLATES_DIR)
 settings = get_settings()
 
+# Shared by every request; connections are opened lazily and reused
+_redis_pool = aioredis.ConnectionPool.from_url(settings.redis_url, max_connections=50)
 
-def get_db():
+
+async def get_db():
     """Database session dependency."""
     db = get_session()
     try:
         yield db
     finally:
-        db.close()
+        await db.close()
 
 
 def get_redis():
-    """Redis connection for caching."""
+    """Redis connection for caching, backed by the shared pool."""
     try:
-        return redis.from_url(settings.redis_url)
+        return aioredis.Redis(connection_pool=_redis_pool)
     except:
         return None
 
 
+# Columns rendered by the recommendation cards and the dashboard
+CARD_COLUMNS = (
+    DBProduct.id,
+    DBProduct.title,
+    DBProduct.price_eur,
+    DBProduct.brand,
+    DBProduct.condition,
+    DBProduct.region,
+)
+
+
+async def get_top_products(db: AsyncSession, user_id: UUID, limit: int) -> List[DBProduct]:
+    """Highest-scored recommended products for a user, in score order."""
+    # Recommendation rows accumulate across generations, so collapse them
+    # to one row (best score) per product before ordering and limiting
+    best = (
+        select(
+            DBRecommendation.product_id,
+            func.max(DBRecommendation.score).label("score"),
+        )
+        .where(DBRecommendation.user_id == user_id)
+        .group_by(DBRecommendation.product_id)
+        .subquery()
+    )
+    result = await db.execute(
+        select(DBProduct)
+        .options(load_only(*CARD_COLUMNS))
+        .join(best, best.c.product_id == DBProduct.id)
+        .order_by(best.c.score.desc())
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
 @router.get("", response_class=HTMLResponse)
 async def get_recommendations(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user: DBUser = Depends(require_auth),
     limit: int = 12,
 ):
@@ -59,10 +95,17 @@ async def get_recommendations(
     
     # Try cache first
     if cache:
-        cached = cache.get(cache_key)
+        cached = await cache.get(cache_key)
         if cached:
-            product_ids = json.loads(cached)
-            products = db.query(DBProduct).filter(DBProduct.id.in_(product_ids)).all()
+            product_ids = orjson.loads(cached)
+            result = await db.execute(
+                select(DBProduct)
+                .options(load_only(*CARD_COLUMNS))
+                .where(DBProduct.id.in_(product_ids))
+            )
+            # Restore the cached score ordering, which IN () does not keep
+            by_id = {str(p.id): p for p in result.scalars().all()}
+            products = [by_id[pid] for pid in product_ids if pid in by_id]
             
             if request.headers.get("HX-Request"):
                 return templates.TemplateResponse(
@@ -76,18 +119,12 @@ async def get_recommendations(
             )
     
     # Get from database (pre-computed recommendations)
-    recommendations = db.query(DBRecommendation) \
-        .filter(DBRecommendation.user_id == user.id) \
-        .order_by(DBRecommendation.score.desc()) \
-        .limit(limit) \
-        .all()
-    
-    product_ids = [str(r.product_id) for r in recommendations]
-    products = db.query(DBProduct).filter(DBProduct.id.in_(product_ids)).all()
+    products = await get_top_products(db, user.id, limit)
+    product_ids = [str(p.id) for p in products]
     
     # Cache for 5 minutes
     if cache and product_ids:
-        cache.setex(cache_key, 300, json.dumps(product_ids))
+        await cache.setex(cache_key, 300, orjson.dumps(product_ids))
     
     if request.headers.get("HX-Request"):
         return templates.TemplateResponse(
@@ -104,7 +141,7 @@ async def get_recommendations(
 @router.post("/feedback")
 async def submit_feedback(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user: DBUser = Depends(require_auth),
 ):
     """
@@ -140,12 +177,12 @@ async def submit_feedback(
             preferences["liked_products"].remove(product_id)
     
     user.preferences = preferences
-    db.commit()
+    await db.commit()
     
     # Invalidate cache
     cache = get_redis()
     if cache:
-        cache.delete(f"recommendations:{user.id}")
+        await cache.delete(f"recommendations:{user.id}")
     
     # Return updated button state (for HTMX)
     return HTMLResponse(
@@ -157,19 +194,12 @@ async def submit_feedback(
 @router.get("/dashboard", response_class=HTMLResponse)
 async def dashboard(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user: DBUser = Depends(require_auth),
 ):
     """User dashboard with recommendations and preferences."""
     # Get recent recommendations
-    recommendations = db.query(DBRecommendation) \
-        .filter(DBRecommendation.user_id == user.id) \
-        .order_by(DBRecommendation.score.desc()) \
-        .limit(6) \
-        .all()
-    
-    product_ids = [r.product_id for r in recommendations]
-    products = db.query(DBProduct).filter(DBProduct.id.in_(product_ids)).all() if product_ids else []
+    products = await get_top_products(db, user.id, 6)
     
     return templates.TemplateResponse(
         "dashboard.html",
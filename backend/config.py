@@ -20,6 +20,9 @@ class Settings(BaseSettings):
     secret_key: str = "CHANGE_ME_IN_PRODUCTION_USE_OPENSSL_RAND"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 60 * 24  # 24 hours
+    jwt_cache_ttl: int = 30  # seconds a verified token -> user mapping is reused
+    use_verify_password_cache: bool = True  # skip bcrypt for recently verified logins
+    bcrypt_rounds: int = 12  # lower (e.g. 10) for local development
     
     # ML Model
     model_path: str = "/models"
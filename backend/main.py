@@ -8,20 +8,16 @@ This is the main application that ties together all components:
 - Static file serving
 """
 from contextlib import asynccontextmanager
-from pathlib import Path
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 
 from config import get_settings
 from api import auth, products, recommendations, hubs
 from services.db import create_tables
+from templating import FRONTEND_DIR, templates
 
-# Resolve frontend directory relative to this file's location
-FRONTEND_DIR = Path(__file__).resolve().parent.parent / "frontend"
-TEMPLATES_DIR = str(FRONTEND_DIR / "templates")
 STATIC_DIR = str(FRONTEND_DIR / "static")
 
 
@@ -29,9 +25,11 @@ STATIC_DIR = str(FRONTEND_DIR / "static")
 async def lifespan(app: FastAPI):
     """
     Lifecycle manager - runs on startup and shutdown.
-    Creates database tables if they don't exist.
+    Creates database tables if they don't exist and pre-renders the
+    anonymous hub pages (skipped in debug so template edits show up).
     """
-    create_tables()
+    await create_tables()
+    app.state.hub_cache = {} if settings.debug else hubs.render_anonymous_hubs()
     yield
 
 
@@ -42,6 +40,7 @@ app = FastAPI(
     description="Privacy-focused used goods comparison engine for Italian marketplaces",
     version="0.1.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS - configure for production
@@ -53,9 +52,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Templates directory
-templates = Jinja2Templates(directory=TEMPLATES_DIR)
-
 # Static files (CSS, JS, images)
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
@@ -0,0 +1,30 @@
+"""
+Piranha Templating
+Single Jinja2 environment shared by the app and every router.
+"""
+import os
+import tempfile
+from pathlib import Path
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+
+from config import get_settings
+
+# Resolve frontend directory relative to this file's location
+FRONTEND_DIR = Path(__file__).resolve().parent.parent / "frontend"
+TEMPLATES_DIR = str(FRONTEND_DIR / "templates")
+
+BYTECODE_CACHE_DIR = os.path.join(tempfile.gettempdir(), "piranha-jinja")
+os.makedirs(BYTECODE_CACHE_DIR, exist_ok=True)
+
+settings = get_settings()
+
+# Templates are only re-stat'ed for changes in debug (hot-reload) mode;
+# compiled bytecode persists across worker restarts.
+templates = Jinja2Templates(
+    directory=TEMPLATES_DIR,
+    auto_reload=settings.debug,
+    cache_size=400,
+    bytecode_cache=FileSystemBytecodeCache(BYTECODE_CACHE_DIR),
+)
@@ -3,7 +3,20 @@ Piranha ML Package
 
 Contains the recommendation model, text embeddings, and training utilities.
 """
+import os
+
+# TensorFlow runtime defaults; must be set before tensorflow is imported.
+# Dedicated GPU threads cut launch latency for small inference batches.
+os.environ.setdefault("TF_GPU_THREAD_MODE", "gpu_private")
+os.environ.setdefault("TF_GPU_THREAD_COUNT", "2")
+os.environ.setdefault("TF_ENABLE_ONEDNN_OPTS", "1")
+
 from .model import PiranhaRecommender, create_recommender
 from .embed import TextEmbedder, get_embedder
+from .index import ItemIndex
+from .store import EmbeddingMatrix
 
-__all__ = ["PiranhaRecommender", "create_recommender", "TextEmbedder", "get_embedder"]
+__all__ = [
+    "PiranhaRecommender", "create_recommender", "TextEmbedder", "get_embedder",
+    "ItemIndex", "EmbeddingMatrix",
+]
@@ -4,11 +4,137 @@ Text Embedding Utilities (TensorFlow-only)
 Generates embeddings from product text using TensorFlow Hub's
 Universal Sentence Encoder (USE). Supports multilingual text.
 """
-from typing import List, Optional
+from concurrent.futures import Future
+from typing import Callable, List, Optional
 import numpy as np
 import os
+import queue
+import threading
+import time
 import tensorflow as tf
 import tensorflow_hub as hub
+import xxhash
+
+
+# Longest description prefix included in a product's embedding text
+MAX_DESCRIPTION_CHARS = 500
+
+
+def build_text(title: str, description: Optional[str] = None) -> str:
+    """
+    Embedding input for a product: the title, plus the (truncated)
+    description when there is one.
+    """
+    if description:
+        return f"{title}. {description[:MAX_DESCRIPTION_CHARS]}"
+    return title
+
+
+def build_text_tensor(title: tf.Tensor, description: tf.Tensor) -> tf.Tensor:
+    """build_text for tf.string tensors (description already truncated)."""
+    return tf.where(
+        tf.strings.length(description) > 0,
+        tf.strings.join([title, ". ", description]),
+        title,
+    )
+
+
+def quantize_int8(vector: np.ndarray) -> bytes:
+    """
+    Pack a float vector as int8 values followed by a float32 scale.
+    
+    Roughly 4x smaller than raw float32; the per-vector scale keeps
+    cosine similarity within ~1% for USE embeddings.
+    """
+    # No copy when the vector is already float32 (USE output always is)
+    vector = np.asarray(vector, dtype=np.float32)
+    scale = float(np.max(np.abs(vector))) / 127 or 1.0
+    scaled = np.multiply(vector, 1 / scale)
+    np.rint(scaled, out=scaled)
+    return scaled.astype(np.int8).tobytes() + np.float32(scale).tobytes()
+
+
+def dequantize_int8(buffer: bytes) -> np.ndarray:
+    """Inverse of quantize_int8, returning a float32 vector."""
+    quantized = np.frombuffer(buffer[:-4], dtype=np.int8)
+    scale = np.frombuffer(buffer[-4:], dtype=np.float32)[0]
+    return np.multiply(quantized, scale, dtype=np.float32)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-text requests into one encoder call.
+    
+    A daemon worker takes the first queued text, keeps collecting for up to
+    max_wait seconds (or max_batch texts), then encodes them as one batch
+    and resolves each caller's future with its row.
+    """
+    
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch: int = 64,
+        max_wait: float = 0.01,
+    ):
+        self.encode_fn = encode_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+        self._worker.start()
+    
+    def submit(self, text: str) -> Future:
+        """Queue a text; the future resolves to its (512,) embedding."""
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+    
+    def _collect(self) -> list:
+        """Block for one request, then gather more until full or timed out."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                embeddings = self.encode_fn([text for text, _ in batch])
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+
+
+def _tracked_resources(root) -> list:
+    """
+    Variables, lookup tables and assets reachable from a loaded SavedModel,
+    without any of its functions.
+    """
+    view = tf.train.TrackableView(root)
+    keep = (tf.Variable, tf.saved_model.experimental.TrackableResource, tf.saved_model.Asset)
+    skip = (tf.types.experimental.GenericFunction, tf.types.experimental.ConcreteFunction)
+    seen, stack, resources = {id(root)}, [root], []
+    while stack:
+        for child in view.children(stack.pop()).values():
+            if id(child) in seen:
+                continue
+            seen.add(id(child))
+            if isinstance(child, keep):
+                resources.append(child)
+            elif not isinstance(child, skip):
+                stack.append(child)
+    return resources
 
 
 class TextEmbedder:
@@ -16,33 +142,114 @@ class TextEmbedder:
     TensorFlow-based text embedder using Universal Sentence Encoder.
     
     Uses the multilingual USE model for Italian text support.
-    Embeddings are cached in Redis for performance.
+    Embeddings are cached in Redis (int8-quantized) for performance.
     """
     
     # Multilingual Universal Sentence Encoder
     MODEL_URL = "https://tfhub.dev/google/universal-sentence-encoder-multilingual/3"
     EMBEDDING_DIM = 512
     
-    def __init__(self, use_cache: bool = True):
+    # Micro-batching of concurrent embed_text calls
+    BATCH_MAX_SIZE = 64
+    BATCH_MAX_WAIT = 0.01  # seconds
+    
+    def __init__(self, use_cache: bool = True, model_url: Optional[str] = None):
         """
         Initialize the embedder.
         
         Args:
             use_cache: Whether to cache embeddings in Redis
+            model_url: TF Hub URL or local SavedModel path; defaults to
+                the USE_MODEL_PATH env var, then MODEL_URL
         """
         self.use_cache = use_cache
+        self.model_url = model_url or os.getenv("USE_MODEL_PATH", self.MODEL_URL)
         self._model = None
+        self._encode = None
         self._redis = None
+        self._batcher = None
+        self._batcher_lock = threading.Lock()
+        # The micro-batcher thread and callers may both trigger the load
+        self._model_lock = threading.Lock()
     
     @property
     def model(self):
-        """Lazy load the model (downloads on first use)."""
+        """
+        Lazy load the model.
+        Downloads on first use unless it is already in TFHUB_CACHE_DIR
+        (pre-fetched in the Docker image) or USE_MODEL_PATH is local.
+        """
         if self._model is None:
-            print("Loading Universal Sentence Encoder (multilingual)...")
-            self._model = hub.load(self.MODEL_URL)
-            print("Model loaded successfully!")
+            with self._model_lock:
+                if self._model is None:
+                    print("Loading Universal Sentence Encoder (multilingual)...")
+                    model = hub.load(self.model_url)
+                    # An export_inference_model directory only has its signature
+                    fn = model
+                    if not callable(fn):
+                        signature = model.signatures["serving_default"]
+                        
+                        def fn(texts):
+                            return signature(texts=texts)["embeddings"]
+                    # Trace once for any 1-D string batch so calls never retrace
+                    self._encode = tf.function(
+                        fn,
+                        input_signature=[tf.TensorSpec([None], tf.string)]
+                    ).get_concrete_function()
+                    # Published after _encode, which encoder checks unlocked
+                    self._model = model
+                    print("Model loaded successfully!")
         return self._model
     
+    def export_inference_model(self, export_dir: str) -> str:
+        """
+        Save the encoder as a signature-only SavedModel.
+        
+        The export holds the "serving_default" signature (texts ->
+        embeddings) plus the variables, tables and assets it reads; the
+        hub module's other functions are not saved. Weights are not
+        frozen or modified. Point USE_MODEL_PATH at the result to load it
+        in place of the hub module.
+        
+        Returns:
+            export_dir
+        """
+        encode = self.encoder
+        
+        @tf.function(input_signature=[tf.TensorSpec([None], tf.string, name="texts")])
+        def serve(texts):
+            return {"embeddings": encode(texts)}
+        
+        root = tf.Module()
+        # The signature captures these, so the root has to track them
+        root.resources = _tracked_resources(self.model)
+        tf.saved_model.save(
+            root,
+            export_dir,
+            signatures={"serving_default": serve.get_concrete_function()},
+        )
+        return export_dir
+    
+    @property
+    def encoder(self):
+        """Concrete function mapping a (batch,) string tensor to (batch, 512)."""
+        if self._encode is None:
+            self.model
+        return self._encode
+    
+    @property
+    def batcher(self) -> MicroBatcher:
+        """Lazy start the micro-batching worker."""
+        if self._batcher is None:
+            with self._batcher_lock:
+                if self._batcher is None:
+                    self._batcher = MicroBatcher(
+                        self.embed_batch,
+                        max_batch=self.BATCH_MAX_SIZE,
+                        max_wait=self.BATCH_MAX_WAIT,
+                    )
+        return self._batcher
+    
     @property
     def redis_client(self):
         """Lazy init Redis client."""
@@ -65,23 +272,22 @@ class TextEmbedder:
         Returns:
             numpy array of shape (512,)
         """
-        # Check cache first
-        cache_key = f"emb:{hash(text) % (10**8)}"
+        # Check cache first (64-bit digest: stable across processes, unlike hash())
+        cache_key = f"emb:{xxhash.xxh3_64_hexdigest(text.encode('utf-8'))}"
         if self.redis_client:
             cached = self.redis_client.get(cache_key)
             if cached:
-                return np.frombuffer(cached, dtype=np.float32)
+                return dequantize_int8(cached)
         
-        # Generate embedding
-        embeddings = self.model([text])
-        embedding = embeddings[0].numpy()
+        # Generate embedding, batched with any concurrent cache misses
+        embedding = self.batcher.submit(text).result()
         
         # Cache for 24 hours
         if self.redis_client:
             self.redis_client.setex(
                 cache_key,
                 86400,
-                embedding.astype(np.float32).tobytes()
+                quantize_int8(embedding)
             )
         
         return embedding
@@ -97,8 +303,10 @@ class TextEmbedder:
         Returns:
             numpy array of shape (len(texts), 512)
         """
-        # USE handles batching efficiently
-        embeddings = self.model(texts)
+        # Explicit dtype so the tensor always matches the encoder's
+        # [None] tf.string signature (an empty list would infer float32)
+        batch_tensor = tf.constant(texts, dtype=tf.string)
+        embeddings = self.encoder(batch_tensor)
         return embeddings.numpy()
     
     def embed_product(self, title: str, description: Optional[str] = None) -> np.ndarray:
@@ -113,12 +321,7 @@ class TextEmbedder:
         Returns:
             numpy array of shape (512,)
         """
-        if description:
-            text = f"{title}. {description[:500]}"  # Truncate long descriptions
-        else:
-            text = title
-        
-        return self.embed_text(text)
+        return self.embed_text(build_text(title, description))
     
     @property
     def embedding_dim(self) -> int:
@@ -130,51 +333,115 @@ class TextEmbedder:
 _embedder_instance: Optional[TextEmbedder] = None
 
 
+def configure_threading():
+    """
+    Size TF's CPU thread pools: one intra-op thread per core, two
+    inter-op threads. No-op if the runtime was already initialized.
+    """
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(os.cpu_count() or 1)
+        tf.config.threading.set_inter_op_parallelism_threads(2)
+    except RuntimeError:
+        pass  # Pools are fixed once TF has executed an op
+
+
 def get_embedder() -> TextEmbedder:
     """Get or create the global embedder instance."""
     global _embedder_instance
     if _embedder_instance is None:
+        configure_threading()
         _embedder_instance = TextEmbedder()
     return _embedder_instance
 
 
-def precompute_embeddings(db_session, batch_size: int = 100):
+def precompute_embeddings(db_session, batch_size: int = 100, matrix_path: Optional[str] = None):
     """
     Pre-compute embeddings for all products in the database.
-    Store in Redis for fast access.
+    Store in Redis for fast access, or, when matrix_path is given, in a
+    single memory-mapped EmbeddingMatrix at that path.
+    
+    Products are read through a prefetching tf.data pipeline, so the next
+    SQL batch is fetched while the current one is being encoded.
+    
+    db_session must be a blocking Session, not the API's AsyncSession:
+    
+        from backend.services.db import get_sync_session
+        with get_sync_session() as db:
+            precompute_embeddings(db)
     """
+    from sqlalchemy import func
     from backend.services.db import Product
+    from .store import EmbeddingMatrix
     
     embedder = get_embedder()
-    offset = 0
-    
-    while True:
-        products = db_session.query(Product) \
-            .order_by(Product.id) \
-            .offset(offset) \
-            .limit(batch_size) \
-            .all()
-        
-        if not products:
-            break
-        
-        texts = [
-            f"{p.title}. {p.description[:500] if p.description else ''}"
-            for p in products
-        ]
-        
-        embeddings = embedder.embed_batch(texts)
-        
-        # Store embeddings in Redis
-        for product, embedding in zip(products, embeddings):
-            if embedder.redis_client:
-                embedder.redis_client.setex(
-                    f"product_emb:{product.id}",
+    done = 0
+    
+    matrix = None
+    if matrix_path:
+        capacity = db_session.query(func.count(Product.id)).scalar()
+        matrix = EmbeddingMatrix.create(matrix_path, capacity, embedder.embedding_dim)
+    
+    def iter_products():
+        last_id = None
+        while True:
+            # Keyset pagination: seek past the last id instead of OFFSET scans
+            # Descriptions arrive already truncated by Postgres
+            query = db_session.query(
+                Product.id,
+                Product.title,
+                func.substr(Product.description, 1, MAX_DESCRIPTION_CHARS).label("description"),
+            )
+            if last_id is not None:
+                query = query.filter(Product.id > last_id)
+            products = query.order_by(Product.id).limit(batch_size).all()
+            
+            if not products:
+                return
+            
+            for p in products:
+                yield str(p.id), p.title, p.description or ""
+            last_id = products[-1].id
+    
+    def to_text(product_id, title, description):
+        return product_id, build_text_tensor(title, description)
+    
+    dataset = tf.data.Dataset.from_generator(
+        iter_products,
+        output_signature=(
+            tf.TensorSpec((), tf.string),
+            tf.TensorSpec((), tf.string),
+            tf.TensorSpec((), tf.string),
+        ),
+    ) \
+        .map(to_text, num_parallel_calls=tf.data.AUTOTUNE) \
+        .batch(batch_size) \
+        .prefetch(tf.data.AUTOTUNE)
+    
+    for id_batch, text_batch in dataset:
+        product_ids = [pid.decode() for pid in id_batch.numpy()]
+        embeddings = embedder.encoder(text_batch).numpy()
+        
+        if matrix is not None:
+            written = matrix.append(product_ids, embeddings)
+            if written < len(product_ids):
+                # Products inserted since the count() query; grow and retry
+                needed = len(matrix.ids) + len(product_ids) - written
+                matrix.reserve(max(2 * matrix.capacity, needed))
+                matrix.append(product_ids[written:], embeddings[written:])
+        # Otherwise store embeddings in Redis, one round-trip per batch
+        elif embedder.redis_client:
+            pipe = embedder.redis_client.pipeline(transaction=False)
+            for product_id, embedding in zip(product_ids, embeddings):
+                pipe.setex(
+                    f"product_emb:{product_id}",
                     86400 * 7,  # 1 week
-                    embedding.astype(np.float32).tobytes()
+                    quantize_int8(embedding)
                 )
+            pipe.execute()
         
-        offset += batch_size
-        print(f"Embedded {offset} products...")
+        done += len(product_ids)
+        print(f"Embedded {done} products...")
     
+    if matrix is not None:
+        matrix.save()
     print("Done!")
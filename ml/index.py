@@ -0,0 +1,113 @@
+"""
+Approximate Nearest-Neighbor Item Index
+
+Serves TwoTowerModel retrieval with FAISS: item vectors are computed once
+over the catalog and indexed, so top-K lookup for a user is an ANN probe
+instead of scoring every item.
+"""
+import math
+from typing import Optional, Tuple
+import numpy as np
+
+from .model import TwoTowerModel
+
+
+class ItemIndex:
+    """
+    FAISS index over L2-normalized item vectors.
+    
+    Vectors are unit length, so inner product equals cosine similarity.
+    Two layouts are supported:
+    - "hnsw": graph index over full vectors (fast, exact vectors in memory)
+    - "ivfpq": inverted lists + 8-bit product quantization (~32x smaller);
+      needs at least IVFPQ_MIN_ITEMS vectors to train
+    """
+    
+    # 8-bit PQ codes have 256 centroids per sub-quantizer, and FAISS refuses
+    # to train with fewer points than centroids. Good recall needs roughly
+    # 39 * max(nlist, 256) training vectors.
+    IVFPQ_MIN_ITEMS = 256
+    
+    def __init__(self, index, item_ids: np.ndarray):
+        self.index = index
+        self.item_ids = np.asarray(item_ids)
+    
+    @classmethod
+    def build(
+        cls,
+        item_vectors: np.ndarray,
+        item_ids: Optional[np.ndarray] = None,
+        kind: str = "hnsw",
+        hnsw_neighbors: int = 32,
+        hnsw_ef_search: int = 64,
+        pq_subquantizers: int = 8,
+        ivf_nprobe: int = 16,
+    ) -> "ItemIndex":
+        """
+        Index a (num_items, dim) matrix of item vectors.
+        
+        Args:
+            item_vectors: unit-length item embeddings
+            item_ids: id for each row (defaults to the row number)
+            kind: "hnsw" or "ivfpq" (ivfpq needs >= IVFPQ_MIN_ITEMS items)
+            hnsw_neighbors: graph degree for HNSW
+            hnsw_ef_search: HNSW search beam width (FAISS default is 16)
+            pq_subquantizers: PQ sub-vectors (must divide dim) for IVF-PQ
+            ivf_nprobe: inverted lists scanned per IVF-PQ query, out of
+                ~sqrt(num_items) (FAISS default is 1)
+        """
+        import faiss
+        
+        vectors = np.ascontiguousarray(item_vectors, dtype=np.float32)
+        num_items, dim = vectors.shape
+        
+        if kind == "hnsw":
+            index = faiss.IndexHNSWFlat(dim, hnsw_neighbors, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efSearch = hnsw_ef_search
+        elif kind == "ivfpq":
+            if num_items < cls.IVFPQ_MIN_ITEMS:
+                raise ValueError(
+                    f"ivfpq needs at least {cls.IVFPQ_MIN_ITEMS} items to train, "
+                    f"got {num_items}; use kind=\"hnsw\" for small catalogs"
+                )
+            nlist = max(1, int(math.sqrt(num_items)))
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFPQ(
+                quantizer, dim, nlist, pq_subquantizers, 8, faiss.METRIC_INNER_PRODUCT
+            )
+            index.train(vectors)
+        else:
+            raise ValueError(f"Unknown index kind: {kind}")
+        
+        index.add(vectors)
+        if kind == "ivfpq":
+            index.nprobe = min(ivf_nprobe, nlist)
+        if item_ids is None:
+            item_ids = np.arange(num_items)
+        return cls(index, item_ids)
+    
+    @classmethod
+    def from_model(
+        cls,
+        model: TwoTowerModel,
+        item_ids: np.ndarray,
+        content_embeddings: Optional[np.ndarray] = None,
+        **kwargs
+    ) -> "ItemIndex":
+        """Run the item tower over the catalog once and index the result."""
+        vectors = model.encode_items(item_ids, content_embeddings)
+        return cls.build(vectors, item_ids, **kwargs)
+    
+    def search(self, user_vectors: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k items for each user vector.
+        
+        Returns:
+            (scores, item_ids), both of shape (num_users, k). Slots FAISS
+            could not fill have score -inf and item id -1.
+        """
+        queries = np.ascontiguousarray(np.atleast_2d(user_vectors), dtype=np.float32)
+        scores, rows = self.index.search(queries, k)
+        ids = np.where(rows >= 0, self.item_ids[rows], -1)
+        scores = np.where(rows >= 0, scores, -np.inf)
+        return scores, ids
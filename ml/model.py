@@ -80,6 +80,10 @@ class PiranhaRecommender(keras.Model):
         """
         Forward pass.
         
+        Left un-jitted so the graph saved by to_inference_engine stays
+        convertible by TF-TRT / grappler; create_recommender compiles the
+        train and predict steps with XLA instead.
+        
         Args:
             inputs: dict with keys:
                 - user_id: (batch_size,) int tensor
@@ -121,6 +125,156 @@ class PiranhaRecommender(keras.Model):
             "num_items": self.num_items,
             "embedding_dim": self.embedding_dim,
         }
+    
+    def to_inference_engine(
+        self,
+        saved_model_dir: str,
+        output_dir: Optional[str] = None,
+        precision_mode: str = "FP16",
+    ) -> str:
+        """
+        Save the model and optimize it for serving on this host.
+        
+        The model must have been called (built) at least once. The saved
+        signature runs with training=False, so Dropout is a no-op and
+        BatchNorm uses its moving statistics.
+        
+        - GPU hosts: convert the SavedModel with TF-TRT, fusing the Dense +
+          BatchNorm stacks into TensorRT engines at `precision_mode`.
+        - CPU hosts: the SavedModel is returned as saved; call
+          configure_serving_runtime() in the serving process.
+        
+        Args:
+            saved_model_dir: where to save the model
+            output_dir: where to write the TF-TRT model (GPU only)
+            precision_mode: TF-TRT precision, "FP32" or "FP16" (INT8 would
+                need a calibration input function and is not supported)
+        
+        Returns:
+            Path of the SavedModel to serve
+        """
+        if precision_mode not in ("FP32", "FP16"):
+            raise ValueError(f"Unsupported precision_mode: {precision_mode} (use FP32 or FP16)")
+        
+        self.save(saved_model_dir)
+        
+        if not tf.config.list_physical_devices("GPU"):
+            return saved_model_dir
+        
+        output_dir = output_dir or f"{saved_model_dir.rstrip('/')}_trt"
+        converter = tf.experimental.tensorrt.Converter(
+            input_saved_model_dir=saved_model_dir,
+            precision_mode=precision_mode,
+            max_workspace_size_bytes=1 << 30,
+        )
+        converter.convert()
+        converter.save(output_dir)
+        return output_dir
+    
+    def export_for_inference(self) -> "InferenceRecommender":
+        """
+        Build an inference-only copy of the model with BatchNorm folded away.
+        
+        The model must have been trained (or at least built). Dropout layers
+        are dropped, and each BatchNormalization is folded into the Dense
+        layer that follows it, leaving the fusion stack as Dense layers only.
+        """
+        return InferenceRecommender(self)
+
+
+def fold_batch_norms(stack: keras.Sequential) -> keras.Sequential:
+    """
+    Rebuild a Dense/BatchNorm/Dropout stack as Dense layers only.
+    
+    In the fusion stack each Dense applies its ReLU *before* BatchNorm, so
+    BN cannot be folded backwards into that Dense. At inference BN is a
+    per-feature affine map, y = h * a + c with a = gamma / sqrt(var + eps)
+    and c = beta - mean * a, so it folds exactly into the next Dense:
+    kernel' = a[:, None] * kernel, bias' = c @ kernel + bias.
+    """
+    folded = []
+    scale = shift = None  # pending BN affine map
+    
+    for layer in stack.layers:
+        if isinstance(layer, keras.layers.Dropout):
+            continue
+        
+        if isinstance(layer, keras.layers.BatchNormalization):
+            mean = layer.moving_mean.numpy()
+            var = layer.moving_variance.numpy()
+            gamma = layer.gamma.numpy() if layer.gamma is not None else np.ones_like(mean)
+            beta = layer.beta.numpy() if layer.beta is not None else np.zeros_like(mean)
+            a = gamma / np.sqrt(var + layer.epsilon)
+            c = beta - mean * a
+            # Compose with any BN still pending (BN -> BN)
+            scale, shift = (a, c) if scale is None else (scale * a, shift * a + c)
+            continue
+        
+        kernel, bias = layer.kernel.numpy(), layer.bias.numpy()
+        if scale is not None:
+            bias = shift @ kernel + bias
+            kernel = scale[:, None] * kernel
+            scale = shift = None
+        
+        dense = keras.layers.Dense(layer.units, activation=layer.activation)
+        dense.build((None, kernel.shape[0]))
+        dense.set_weights([kernel, bias])
+        folded.append(dense)
+    
+    if scale is not None:
+        raise ValueError("Cannot fold a trailing BatchNormalization layer")
+    
+    return keras.Sequential(folded, name=f"{stack.name}_folded")
+
+
+class InferenceRecommender(tf.Module):
+    """
+    Serving-only form of PiranhaRecommender (see export_for_inference).
+    
+    Same scores as the trained model with training=False, computed by a
+    fusion stack of plain Dense layers. The embedding tables are frozen
+    constants read with tf.gather, skipping keras.layers.Embedding's
+    per-call overhead.
+    """
+    
+    def __init__(self, model: PiranhaRecommender):
+        super().__init__(name="inference_recommender")
+        self.user_table = tf.constant(model.user_embedding.embeddings.numpy())
+        self.item_table = tf.constant(model.item_embedding.embeddings.numpy())
+        self.content_processor = model.content_processor
+        self.fusion = fold_batch_norms(model.fusion)
+    
+    @tf.function(jit_compile=True)
+    def __call__(self, inputs: dict) -> tf.Tensor:
+        """Score (user, item[, content]) batches; see PiranhaRecommender.call."""
+        user_vec = tf.gather(self.user_table, inputs["user_id"], axis=0)
+        item_vec = tf.gather(self.item_table, inputs["item_id"], axis=0)
+        collab_signal = user_vec * item_vec
+        
+        content_emb = inputs.get("content_embedding")
+        if content_emb is not None:
+            content_vec = self.content_processor(content_emb, training=False)
+            combined = tf.concat([collab_signal, user_vec, item_vec, content_vec], axis=-1)
+        else:
+            combined = tf.concat([collab_signal, user_vec, item_vec], axis=-1)
+        
+        return self.fusion(combined)
+
+
+def configure_serving_runtime():
+    """
+    Call this in the serving process, before loading the model.
+    
+    On CPU-only hosts, enables grappler's oneDNN bfloat16
+    auto-mixed-precision pass. The option is process-global: it applies to
+    every graph the process runs (the USE encoder included), so prefer a
+    process that serves only the recommender. No-op on GPU hosts, where
+    to_inference_engine's TF-TRT engines already set the precision.
+    """
+    if not tf.config.list_physical_devices("GPU"):
+        tf.config.optimizer.set_experimental_options(
+            {"auto_mixed_precision_onednn_bfloat16": True}
+        )
 
 
 def create_recommender(
@@ -135,13 +289,16 @@ def create_recommender(
         embedding_dim=embedding_dim,
     )
     
+    # XLA fuses the user/item gathers with the collaborative product in
+    # fit/predict; the SavedModel signature is traced without it.
     model.compile(
         optimizer=keras.optimizers.Adam(learning_rate=0.001),
         loss=keras.losses.BinaryCrossentropy(),
         metrics=[
             keras.metrics.BinaryAccuracy(name="accuracy"),
             keras.metrics.AUC(name="auc"),
-        ]
+        ],
+        jit_compile=True,
     )
     
     return model
@@ -165,29 +322,35 @@ class TwoTowerModel(keras.Model):
         num_items: int,
         embedding_dim: int = 64,
         content_dim: int = 384,
+        mixed_precision: bool = False,
         **kwargs
     ):
         super().__init__(**kwargs)
         
+        # Tower Dense layers compute in bfloat16 (fp32 weights) when enabled;
+        # scoped to this model rather than set as the global policy
+        tower_dtype = "mixed_bfloat16" if mixed_precision else None
+        
         # User tower
         self.user_embedding = keras.layers.Embedding(num_users, embedding_dim)
         self.user_tower = keras.Sequential([
-            keras.layers.Dense(128, activation="relu"),
-            keras.layers.Dense(embedding_dim),
-            keras.layers.Lambda(lambda x: tf.nn.l2_normalize(x, axis=1))
+            keras.layers.Dense(128, activation="relu", dtype=tower_dtype),
+            keras.layers.Dense(embedding_dim, dtype=tower_dtype),
+            keras.layers.UnitNormalization(axis=1)
         ], name="user_tower")
         
         # Item tower (includes content)
         self.item_embedding = keras.layers.Embedding(num_items, embedding_dim)
         self.item_tower = keras.Sequential([
-            keras.layers.Dense(256, activation="relu"),
-            keras.layers.Dense(embedding_dim),
-            keras.layers.Lambda(lambda x: tf.nn.l2_normalize(x, axis=1))
+            keras.layers.Dense(256, activation="relu", dtype=tower_dtype),
+            keras.layers.Dense(embedding_dim, dtype=tower_dtype),
+            keras.layers.UnitNormalization(axis=1)
         ], name="item_tower")
         
         # Temperature for softmax
         self.temperature = tf.Variable(0.05, trainable=True, name="temperature")
     
+    @tf.function(jit_compile=True)
     def call(self, inputs: dict, training: bool = False) -> tf.Tensor:
         """Compute similarity between user and item embeddings."""
         user_id = inputs["user_id"]
@@ -204,8 +367,43 @@ class TwoTowerModel(keras.Model):
             item_vec = tf.concat([item_vec, content_emb], axis=-1)
         item_vec = self.item_tower(item_vec, training=training)
         
-        # Cosine similarity
-        similarity = tf.reduce_sum(user_vec * item_vec, axis=-1, keepdims=True)
+        # Cosine similarity as a single fused dot, kept in fp32 for the sigmoid
+        similarity = tf.einsum("be,be->b", user_vec, item_vec)[:, None]
+        similarity = tf.cast(similarity, tf.float32)
         score = tf.nn.sigmoid(similarity / self.temperature)
         
         return score
+    
+    def encode_users(self, user_ids: np.ndarray, batch_size: int = 1024) -> np.ndarray:
+        """
+        Run the user tower over user ids for retrieval.
+        
+        Returns:
+            (len(user_ids), embedding_dim) float32 array of unit vectors
+        """
+        vectors = []
+        for start in range(0, len(user_ids), batch_size):
+            user_vec = self.user_embedding(user_ids[start:start + batch_size])
+            vectors.append(self.user_tower(user_vec, training=False))
+        return tf.cast(tf.concat(vectors, axis=0), tf.float32).numpy()
+    
+    def encode_items(
+        self,
+        item_ids: np.ndarray,
+        content_embeddings: Optional[np.ndarray] = None,
+        batch_size: int = 1024,
+    ) -> np.ndarray:
+        """
+        Run the item tower over the catalog, e.g. to build an ANN index.
+        
+        Returns:
+            (len(item_ids), embedding_dim) float32 array of unit vectors
+        """
+        vectors = []
+        for start in range(0, len(item_ids), batch_size):
+            stop = start + batch_size
+            item_vec = self.item_embedding(item_ids[start:stop])
+            if content_embeddings is not None:
+                item_vec = tf.concat([item_vec, content_embeddings[start:stop]], axis=-1)
+            vectors.append(self.item_tower(item_vec, training=False))
+        return tf.cast(tf.concat(vectors, axis=0), tf.float32).numpy()
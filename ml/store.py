@@ -0,0 +1,131 @@
+"""
+Product Embedding Matrix
+
+Stores all product embeddings as one contiguous float32 matrix on disk
+(numpy.memmap) plus a product_id -> row mapping, so scoring code can read
+many vectors at once instead of issuing one Redis GET per product.
+"""
+import json
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+
+class EmbeddingMatrix:
+    """
+    Memory-mapped (num_products, dim) float32 matrix.
+    
+    The OS page cache keeps hot rows in memory. `<path>.ids.json` holds the
+    row ids and names the data file they belong to (`<path>.<version>`).
+    
+    A new matrix is built in `<path>.tmp` and published by save() with a
+    single os.replace of the sidecar, so readers either see the old ids
+    and rows or the new ones, and files already mapped are never truncated.
+    """
+    
+    # open() retries when a concurrent save() removes the data file it named
+    OPEN_ATTEMPTS = 3
+    
+    def __init__(self, matrix: np.memmap, path: str, ids: List[str], build_path: Optional[str] = None):
+        self.matrix = matrix
+        self.path = path
+        self.ids = ids
+        self.id2row: Dict[str, int] = {pid: row for row, pid in enumerate(ids)}
+        # File being written while building; None once published or when opened
+        self.build_path = build_path
+    
+    @classmethod
+    def create(cls, path: str, capacity: int, dim: int = 512) -> "EmbeddingMatrix":
+        """Allocate a writable matrix with room for `capacity` products."""
+        build_path = f"{path}.tmp"
+        matrix = np.memmap(build_path, dtype=np.float32, mode="w+", shape=(max(capacity, 1), dim))
+        return cls(matrix, path, [], build_path)
+    
+    @classmethod
+    def open(cls, path: str, dim: int = 512) -> "EmbeddingMatrix":
+        """Open the last saved matrix read-only."""
+        for attempt in range(cls.OPEN_ATTEMPTS):
+            with open(f"{path}.ids.json") as f:
+                meta = json.load(f)
+            data_path = os.path.join(os.path.dirname(path), meta["matrix"])
+            try:
+                matrix = np.memmap(data_path, dtype=np.float32, mode="r", shape=(max(len(meta["ids"]), 1), dim))
+            except FileNotFoundError:
+                if attempt == cls.OPEN_ATTEMPTS - 1:
+                    raise
+                continue
+            return cls(matrix, path, meta["ids"])
+    
+    @property
+    def capacity(self) -> int:
+        return self.matrix.shape[0]
+    
+    def reserve(self, capacity: int):
+        """Grow the file to hold at least `capacity` rows, keeping written ones."""
+        if capacity <= self.capacity:
+            return
+        self.matrix.flush()
+        # r+ with a larger shape extends the file in place
+        self.matrix = np.memmap(self.build_path, dtype=np.float32, mode="r+", shape=(capacity, self.matrix.shape[1]))
+    
+    def append(self, product_ids: Sequence, embeddings: np.ndarray) -> int:
+        """
+        Write embeddings into the next free rows.
+        
+        Returns:
+            Number of rows written (fewer than given once capacity is reached)
+        """
+        start = len(self.ids)
+        count = min(len(product_ids), self.capacity - start)
+        if count <= 0:
+            return 0
+        self.matrix[start:start + count] = embeddings[:count]
+        for pid in product_ids[:count]:
+            self.id2row[str(pid)] = len(self.ids)
+            self.ids.append(str(pid))
+        return count
+    
+    def save(self):
+        """
+        Flush rows and publish them. Processes that already mapped the
+        previous matrix keep reading it until they reopen.
+        """
+        self.matrix.flush()
+        try:
+            with open(f"{self.path}.ids.json") as f:
+                previous = json.load(f)["matrix"]
+        except (OSError, ValueError, KeyError, TypeError):
+            previous = None
+        
+        data_name = f"{os.path.basename(self.path)}.{time.time_ns()}"
+        os.replace(self.build_path, os.path.join(os.path.dirname(self.path), data_name))
+        with open(f"{self.build_path}.ids.json", "w") as f:
+            json.dump({"matrix": data_name, "ids": self.ids}, f)
+        # The publish step: new readers now resolve the new data file
+        os.replace(f"{self.build_path}.ids.json", f"{self.path}.ids.json")
+        self.build_path = None
+        
+        # Unlinking keeps existing mappings of the old file valid
+        if previous and previous != data_name:
+            try:
+                os.remove(os.path.join(os.path.dirname(self.path), previous))
+            except OSError:
+                pass
+    
+    @property
+    def vectors(self) -> np.ndarray:
+        """All filled rows as a (n, dim) view, for batch scoring."""
+        return self.matrix[:len(self.ids)]
+    
+    def lookup(self, product_ids: Sequence) -> Tuple[List[str], np.ndarray]:
+        """
+        Embeddings for the given products.
+        
+        Returns:
+            (found_ids, vectors): the ids that have a row, in request order,
+            and their (k, dim) embeddings; row i belongs to found_ids[i].
+            Unknown ids are left out of both.
+        """
+        found = [str(pid) for pid in product_ids if str(pid) in self.id2row]
+        return found, self.matrix[[self.id2row[pid] for pid in found]]